@@ -6,6 +6,7 @@ import argparse
 import configparser
 import logging
 import ast
+import threading
 from dataclasses import dataclass, field
 from enum import Enum, Flag, IntFlag
 from datetime import datetime, timedelta
@@ -149,6 +150,8 @@ def get_mirror_links(setid: int, format=False) -> list[str]:
     else:
         return [link[0] for link in links]
 
+_osuv2_token_lock = threading.Lock()
+
 def try_get_osuv2_credentials(cfg: Config):
     if not cfg: return False
     # TODO: handle refreshes if needed for creds.token
@@ -172,6 +175,9 @@ def try_get_osuv2_credentials(cfg: Config):
     creds.token = BearerToken(str(data['access_token']), expires)
     return True
 
+# mods that don't change the map difficulty
+_non_difficulty_mods = frozenset(('NF', 'NM', 'FREEMOD', 'SO', 'SD', 'PF', 'AP', 'RL', 'AT', 'CM', 'TP'))
+
 def try_get_map_info(cfg: Config, mapid: int, label: str = '', mods: str = '') -> MapInfo | None:
     """Try to get a map's info (set name, diff name, etc.) from public apis"""
     if mapid is None: return None
@@ -188,17 +194,19 @@ def try_get_map_info(cfg: Config, mapid: int, label: str = '', mods: str = '') -
         if cfg is not None:
             creds = cfg.osu_apiv2_credentials
             if creds.enabled and not creds.token_failed:
-                if not creds.token or creds.token.expires_utc < datetime.utcnow():
-                    got_token = try_get_osuv2_credentials(cfg)
-                    if not got_token:
-                        log.error(
-                            "Could not use the osu v2 api. Did you set up the client id/client secret in the config file?\n"
-                            "If you don't have one, you have to set it up at https://osu.ppy.sh/home/account/edit#new-oauth-application\n"
-                            "Name: 'osu-tourney-helper'\n"
-                            "Callback url: <blank>\n"
-                            "Then copy the client id/client secret into the config file"
-                        )
-                        creds.token_failed = True
+                # map infos may be fetched from several threads, only one of them should request a token
+                with _osuv2_token_lock:
+                    if not creds.token_failed and (not creds.token or creds.token.expires_utc < datetime.utcnow()):
+                        got_token = try_get_osuv2_credentials(cfg)
+                        if not got_token:
+                            log.error(
+                                "Could not use the osu v2 api. Did you set up the client id/client secret in the config file?\n"
+                                "If you don't have one, you have to set it up at https://osu.ppy.sh/home/account/edit#new-oauth-application\n"
+                                "Name: 'osu-tourney-helper'\n"
+                                "Callback url: <blank>\n"
+                                "Then copy the client id/client secret into the config file"
+                            )
+                            creds.token_failed = True
                 if creds.token and not creds.token_failed:
                     # see https://osu.ppy.sh/docs/index.html
                     map_data = try_json_request(
@@ -247,8 +255,7 @@ def try_get_map_info(cfg: Config, mapid: int, label: str = '', mods: str = '') -
                     if not last_updated: last_updated = parse_datetime(str(get_many(set_data, 'last_updated', 'last_update', 'lastupdated', 'lastupdate', default='')))
         
         if map_data and set_data and _mapid == mapid and setid != -1:
-            non_difficulty_mods = set(('NF', 'NM', 'FREEMOD', 'SO', 'SD', 'PF', 'AP', 'RL', 'AT', 'CM', 'TP'))
-            filtered_mods = [mod for mod in mods.upper().split(' ') if mod and mod not in non_difficulty_mods]
+            filtered_mods = [mod for mod in mods.upper().split(' ') if mod and mod not in _non_difficulty_mods]
 
             # estimates / mod effects that aren't captured by the osu scorev2 api
             # https://osu.ppy.sh/wiki/en/Gameplay/Game_modifier
@@ -2,7 +2,12 @@ from __future__ import annotations
 import os
 import ssl
 import json
+import time
+import threading
+from collections import deque
 from datetime import datetime, timedelta
+from functools import cached_property
+import http.client
 from http.client import HTTPResponse
 from typing import TypeVar, Callable, Generator, Generic, Optional
 import urllib.error, urllib.request, urllib.response, urllib.parse
@@ -56,6 +61,30 @@ class Lazy(Generic[T]):
             self._value = self._func()
         return self._value
 
+class RateLimiter:
+    """Thread-safe sliding window rate limiter, allows at most `max_calls` every `period` seconds"""
+    def __init__(self, max_calls: int, period: float = 1.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_event: threading.Event | None = None) -> bool:
+        """Block until another call is allowed. Returns False if `cancel_event` was set while waiting"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return True
+                delay = self._calls[0] + self.period - now
+            if cancel_event is None:
+                time.sleep(delay)
+            elif cancel_event.wait(delay):
+                return False
+
 class JsonResponse:
     """Wrapper over a dict + status code / ok and message in case of not ok.
     This supports most dict read operators as well as truthiness check for 'is response ok'
@@ -84,11 +113,50 @@ class JsonResponse:
         else:
             return False
 
-# context to ignore ssl cert issues
+# context to ignore ssl cert issues, also shared with the irc connection
 ssl_ctx = ssl.create_default_context()
 ssl_ctx.check_hostname = False
 ssl_ctx.verify_mode = ssl.CERT_NONE
 
+# seconds to wait on the server, for both the kept alive connections and the urllib fallback
+__REQUEST_TIMEOUT = 30
+
+# https connections kept alive per (thread, host), so fetching many maps from the same api only does one tls handshake
+__connections = threading.local()
+
+def __keep_alive_request(url: str, headers: dict[str,str], data: bytes | None, method: str) -> tuple[HTTPResponse | None, bytes]:
+    """Send the request over a kept alive https connection. Returns (None, b'') if the request should go through urllib instead"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != 'https':
+        return None, b''
+    # urllib knows how to go through a proxy (*_proxy env vars), this doesn't
+    if urllib.request.getproxies().get('https') and not urllib.request.proxy_bypass(parts.hostname or ''):
+        return None, b''
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    if not hasattr(__connections, 'by_host'):
+        __connections.by_host = {}
+    by_host: dict[str, http.client.HTTPSConnection] = __connections.by_host
+    for attempt in range(2):
+        conn = by_host.get(parts.netloc)
+        if conn is None:
+            conn = http.client.HTTPSConnection(parts.netloc, timeout=__REQUEST_TIMEOUT, context=ssl_ctx)
+            by_host[parts.netloc] = conn
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+            return resp, resp.read()
+        except Exception as ex:
+            # never reuse a connection in an unknown state (timeout, partial read, ...)
+            conn.close()
+            del by_host[parts.netloc]
+            # the server closed our idle connection, reconnect once
+            stale = isinstance(ex, (http.client.RemoteDisconnected, http.client.CannotSendRequest, http.client.BadStatusLine, ConnectionError))
+            if attempt or not stale:
+                raise
+    return None, b''
+
 def try_json_request(url: str, lower_keys=True, headers: dict[str,str] | None = None, body = None, method='GET'):
     try:
         log.debug(f"try to hit {url}")
@@ -118,9 +186,21 @@ def try_json_request(url: str, lower_keys=True, headers: dict[str,str] | None =
             data = data.encode()
         # headers['Content-Length'] = len(body)
         
-        req = urllib.request.Request(url, headers=headers, data=data, method=method)
-        resp: HTTPResponse = urllib.request.urlopen(req, context=ssl_ctx)
-        resp_body: bytes = resp.read()
+        resp, resp_body = __keep_alive_request(url, headers, data, method)
+        if resp is not None and 300 <= resp.status < 400 and resp.getheader('Location'):
+            # follow the redirect with urllib (don't send the same request again),
+            # 301/302/303 become a GET like in browsers, 307/308 keep the method and body
+            url = urllib.parse.urljoin(url, resp.getheader('Location'))
+            if resp.status not in (307, 308):
+                method, data = 'GET', None
+            resp = None
+        if resp is None:
+            # not https, behind a proxy, or a redirect: let urllib deal with it
+            req = urllib.request.Request(url, headers=headers, data=data, method=method)
+            resp = urllib.request.urlopen(req, context=ssl_ctx, timeout=__REQUEST_TIMEOUT)
+            resp_body = resp.read()
+        elif resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
         if resp.status != 200:
             return JsonResponse(False, resp.status, resp_body.decode(), {})
         raw_json: dict[str,object] = json.loads(resp_body.decode())
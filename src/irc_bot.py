@@ -89,9 +89,10 @@ class BaseOsuIRCBot(irc.bot.SingleServerIRCBot):
         self._connect()
         if self.connection.is_connected():
             self.set_motd_event()
+        process_once = self.reactor.process_once
         try:
             while not self._stopped:
-                self.reactor.process_once(timeout)
+                process_once(timeout)
         except KeyboardInterrupt:
             self.stop()
             raise
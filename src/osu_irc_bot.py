@@ -125,6 +125,12 @@ class OsuIRCBot(BaseOsuIRCBot):
 
     ## ----------------------------------------------------------------------
 
+    def wait_for_map_infos(self):
+        if self.map_infos_populated_event.is_set() or self.map_infos_populated_event.wait(1):
+            return
+        Console.writeln("Waiting (max 30s) for map infos to be populated (this is a one-time cost)")
+        self.map_infos_populated_event.wait(30)
+
     def lookup_map(self, label: str):
         return next((m for m in self.cfg.maps if m.label == label), None)
 
@@ -254,10 +260,7 @@ class OsuIRCBot(BaseOsuIRCBot):
         
         elif command in ('mp maplist', 'mp map_list', 'maplist', 'map_list'):
             if source == '@@bot':
-                self.map_infos_populated_event.wait(1)
-                if not self.map_infos_populated_event.is_set():
-                    Console.writeln("Waiting (max 30s) for map infos to be populated (this is a one-time cost)")
-                    self.map_infos_populated_event.wait(30)
+                self.wait_for_map_infos()
                 with Console.LockedWriter() as w:
                     font = 'mono'
                     join_text = ' | '
@@ -280,11 +283,8 @@ class OsuIRCBot(BaseOsuIRCBot):
                 return True
             
             elif self.room_id:
-                self.map_infos_populated_event.wait(1)
-                if not self.map_infos_populated_event.is_set():
-                    Console.writeln('Waiting (max 30s) for map infos to be populated (this is a one-time cost)')
-                    self.map_infos_populated_event.wait(30)
-                    
+                self.wait_for_map_infos()
+
                 font = OsuFontNames.STABLE
                 font = 'aller'
                 join_text = ' | '
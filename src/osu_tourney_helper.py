@@ -1,9 +1,10 @@
 from __future__ import annotations
 import sys
 import traceback
-import ssl
+import functools
 import threading
 from threading import Event
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Callable
 import irc
 import irc.bot
@@ -12,7 +13,8 @@ import irc.connection
 import jaraco.stream.buffer
 
 from console import Console, log
-from config import Config, parse_config, try_populate_map_info
+from config import Config, MapChoice, parse_config, try_populate_map_info
+from helpers import RateLimiter, ssl_ctx
 from interactive_console import InteractiveConsole, test_interactive_console
 from osu_irc_bot import OsuIRCBot
 
@@ -20,31 +22,83 @@ class IgnoreErrorsBuffer(jaraco.stream.buffer.DecodingLineBuffer):
     def handle_exception(self):
         pass
 
-def populate_map_infos(cfg: Config, map_infos_populated_event: Event, stop_event: Event):
-    map_infos_populated_event.clear()
-    for map in cfg.maps:
-        if not map or map.map_info:
-            continue
-        if stop_event.is_set():
-            break
-        try_populate_map_info(cfg, map)
-        if not cfg.osu_apiv2_credentials or not cfg.osu_apiv2_credentials.token:
-            stop_event.wait(0.05) # avoid being rate-limited, but osu apiv2 has a _very_ high rate limit
-    # in case we still got rate-limited, try again with some delay
-    did_delay = False
-    for map in cfg.maps:
-        if not map or map.map_info:
-            continue
-        if stop_event.is_set():
-            break
-        if not map.map_info and map.mapid:
-            if not did_delay:
-                stop_event.wait(2)
-                if stop_event.is_set():
-                    break
-                did_delay = True
-            try_populate_map_info(cfg, map)
-    map_infos_populated_event.set()
+class FastLenientLineBuffer(jaraco.stream.buffer.LineBuffer):
+    """Same behavior as the LenientDecodingLineBuffer (UTF-8, falling back to latin-1 per line),
+    but keeps one growable bytearray and decodes all complete lines in a single call
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes):
+        self.buffer += data
+
+    def lines(self):
+        end = self.buffer.rfind(b'\n') + 1
+        if not end:
+            return iter(())
+        chunk = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        try:
+            lines = chunk.decode('utf-8').split('\n')
+        except UnicodeDecodeError:
+            lines = [self._decode_line(line) for line in chunk.split(b'\n')]
+        lines.pop() # always empty, chunk ends with '\n'
+        return iter([line[:-1] if line.endswith('\r') else line for line in lines])
+
+    def __iter__(self):
+        return self.lines()
+
+    @staticmethod
+    def _decode_line(line: bytes):
+        try:
+            return line.decode('utf-8')
+        except UnicodeDecodeError:
+            return line.decode('latin-1')
+
+def populate_map_infos(cfg: Config, map_infos_populated_event: Event, stop_event: Event) -> ThreadPoolExecutor:
+    """Start fetching the map infos in the background, `map_infos_populated_event` is set once they are all done.
+    Returns the executor doing the fetching so it can be shut down
+    """
+    # osu apiv2 has a _very_ high rate limit, but the public mirrors will rate-limit us quickly
+    limiter = RateLimiter(10, 1.0)
+    pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='map_info_fetch')
+    is_stopped = stop_event.is_set
+
+    def fetch_map_info(map: MapChoice):
+        if is_stopped() or not limiter.acquire(stop_event):
+            return None
+        return try_populate_map_info(cfg, map)
+
+    def fetch_all(maps: list[MapChoice], on_done: Callable[[list[MapChoice]], None]):
+        """Fetch all `maps`, then call `on_done` with the ones that could be retried"""
+        if not maps or is_stopped():
+            on_done([])
+            return
+        remaining = len(maps)
+        failed: list[MapChoice] = []
+        lock = threading.Lock()
+        def fetch_done(map: MapChoice, _: Future):
+            nonlocal remaining
+            with lock:
+                if not map.map_info and map.mapid:
+                    failed.append(map)
+                remaining -= 1
+                finished = remaining == 0
+            if finished:
+                on_done(failed)
+        try:
+            for map in maps:
+                pool.submit(fetch_map_info, map).add_done_callback(functools.partial(fetch_done, map))
+        except RuntimeError:
+            # the pool was shut down while we were submitting
+            map_infos_populated_event.set()
+
+    def retry(failed: list[MapChoice]):
+        # in case we got rate-limited, try again
+        fetch_all(failed, lambda _: map_infos_populated_event.set())
+
+    fetch_all([map for map in cfg.maps if map and not map.map_info], retry)
+    return pool
 
 def trap_interrupt(fn: Callable, *args, **kwagrs):
     try:
@@ -56,33 +110,34 @@ def main_bot():
     cfg = parse_config()
     Console.enable_colors = cfg.enable_console_colors
 
-    # The LenientDecodingLineBuffer attempts UTF-8 but falls back to latin-1, which will avoid UnicodeDecodeError in all cases (but may produce unexpected behavior if an IRC user is using another encoding).
-    # or use IgnoreErrorsBuffer to ignore all errors
-    irc.client.ServerConnection.buffer_class = jaraco.stream.buffer.LenientDecodingLineBuffer
-
-    if cfg.tls:
-        connect_factory = irc.connection.Factory(wrapper=ssl.wrap_socket)
-    else:
-        connect_factory = irc.connection.Factory()
-
+    # start fetching map infos right away, it's the slowest part of startup and doesn't depend on the irc connection
     stop_event = Event()
     map_infos_populated_event = Event()
-    bot_response_event = Event()
-    bot_motd_event = Event()
-    bot = OsuIRCBot(
-        cfg,
-        response_event=bot_response_event,
-        motd_event=bot_motd_event,
-        map_infos_populated_event=map_infos_populated_event,
-        connect_factory=connect_factory
-    )
-    iconsole = InteractiveConsole(bot, cfg, stop_event)
-
-    map_info_thread = threading.Thread(target=trap_interrupt, args=(populate_map_infos, cfg, map_infos_populated_event, stop_event), daemon=True, name='map_info_fetch')
-    console_thread = threading.Thread(target=trap_interrupt, args=(iconsole.main_loop, ), name='interactive_console')
-    bot_thread = threading.Thread(target=bot.start, args=(), daemon=True, name='irc_bot')
+    map_info_pool = populate_map_infos(cfg, map_infos_populated_event, stop_event)
+    bot = None
+    bot_thread = None
+    console_thread = None
     try:
-        map_info_thread.start()
+        # The FastLenientLineBuffer attempts UTF-8 but falls back to latin-1, which will avoid UnicodeDecodeError in all cases (but may produce unexpected behavior if an IRC user is using another encoding).
+        # or use IgnoreErrorsBuffer to ignore all errors
+        irc.client.ServerConnection.buffer_class = FastLenientLineBuffer
+
+        if cfg.tls:
+            connect_factory = irc.connection.Factory(wrapper=functools.partial(ssl_ctx.wrap_socket, server_hostname=cfg.server))
+        else:
+            connect_factory = irc.connection.Factory()
+
+        # the bot creates its own response and motd events, the console waits on them through the bot
+        bot = OsuIRCBot(
+            cfg,
+            map_infos_populated_event=map_infos_populated_event,
+            connect_factory=connect_factory
+        )
+        iconsole = InteractiveConsole(bot, cfg, stop_event)
+
+        # daemon: if it's blocked in readchar() it can't easily be woken up, and it shouldn't keep the process alive
+        console_thread = threading.Thread(target=trap_interrupt, args=(iconsole.main_loop, ), daemon=True, name='interactive_console')
+        bot_thread = threading.Thread(target=bot.start, args=(), daemon=True, name='irc_bot')
         console_thread.start()
         bot_thread.start()
         console_thread.join()
@@ -92,10 +147,15 @@ def main_bot():
         traceback.print_exc()
     finally:
         stop_event.set()
-        bot.shutdown()
-        bot_thread.join()
-        map_info_thread.join()
-        console_thread.join(2) # if it's hanging on readchar() it can't easily be killed
+        if bot:
+            bot.shutdown()
+        if bot_thread and bot_thread.is_alive():
+            bot_thread.join()
+        map_info_pool.shutdown(wait=True, cancel_futures=True)
+        # closing stdin does not wake up a blocked read() on posix, so don't wait long for it.
+        # it only ever blocks on reading a key, and the terminal settings are restored by the caller
+        if console_thread and console_thread.is_alive():
+            console_thread.join(0.1)
 
 if __name__ == '__main__':
     try:
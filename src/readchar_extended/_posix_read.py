@@ -1,17 +1,51 @@
 from __future__ import annotations
+import sys
+import contextlib
+import termios
 from readchar import config
-from readchar import readchar as __readchar
 
 # for posix readchar, see https://manpages.debian.org/bullseye/manpages-dev/termios.3.en.html
+@contextlib.contextmanager
+def __raw_mode():
+    """Switch stdin to the mode keys are read in, and restore the previous mode afterwards"""
+    fd = sys.stdin.fileno()
+    old_mode = termios.tcgetattr(fd)
+    mode = termios.tcgetattr(fd)
+    # no line mode or echo (already cleared by Console.try_patch_stdin_stdout_behavior), and no signals so ctrl+c
+    # is read as a key and raised by readkey. readchar masks lflag with IGNBRK | BRKINT, which are iflag constants
+    # but have the same values as ISIG | ICANON, so this keeps its behavior.
+    # the console leaves ISIG set, so this usually does switch modes
+    mode[3] &= ~(termios.ICANON | termios.ECHO | termios.ISIG)
+    changed = mode != old_mode
+    if changed:
+        termios.tcsetattr(fd, termios.TCSADRAIN, mode)
+    try:
+        yield
+    finally:
+        if changed:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_mode)
+
+def __read() -> str:
+    # read through sys.stdin (not the raw fd) so this shares one buffer with Console.get_cursor_pos,
+    # which reads the terminal's cursor position response from the same stream.
+    # the text wrapper reads whatever is available at once, so the rest of an escape sequence is usually already buffered
+    return sys.stdin.read(1)
+
 def readchar() -> str:
     """Reads a single character from the input stream.
     Blocks until a character is available."""
-    return __readchar()
+    with __raw_mode():
+        return __read()
 
 def readkey() -> str:
     """Get a keypress. If an escaped key is pressed, the full sequence is
     read and returned as noted in `_posix_key.py`."""
-    c1 = readchar()
+    # switch modes once for the whole key rather than for every char of an escape sequence
+    with __raw_mode():
+        return __readkey()
+
+def __readkey() -> str:
+    c1 = __read()
 
     if c1 in config.INTERRUPT_KEYS:
         raise KeyboardInterrupt
@@ -20,26 +54,30 @@ def readkey() -> str:
     if c1 != '\x1b':
         return c1
 
-    c2 = readchar()
+    # build the sequence up in place, chars after the escape can be anything (ie alt+é) so this stays a str
+    c2 = __read()
+    seq = c1 + c2
     if c2 not in '\x4f\x5b':
-        return ''.join((c1, c2))
+        return seq
 
-    c3 = readchar()
+    c3 = __read()
+    seq += c3
     if c3 not in '\x31\x32\x33\x35\x36\x3b\x3f':
-        return ''.join((c1, c2, c3))
+        return seq
 
     # \x3b: need 2 chars afterwards
-    c4 = readchar()
+    c4 = __read()
+    seq += c4
     if c3 != '\x3b' and c4 not in '\x30\x31\x33\x34\x35\x37\x38\x39\x3b':
-        return ''.join((c1, c2, c3, c4))
+        return seq
 
-    c5 = readchar()
+    c5 = __read()
+    seq += c5
     if c4 != '\x3b' and c5 not in '\x33\x35\x3b':
-        return ''.join((c1, c2, c3, c4, c5))
-    
-    c6 = readchar()
+        return seq
+
+    seq += __read()
     if c5 != '\x3b':
-        return ''.join((c1, c2, c3, c4, c5, c6))
-    
-    c7 = readchar()
-    return ''.join((c1, c2, c3, c4, c5, c6, c7))
+        return seq
+
+    return seq + __read()
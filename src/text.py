@@ -1,18 +1,12 @@
 from __future__ import annotations
 import os
-import json
-from typing import Generator, AsyncGenerator
+from typing import Collection, Generator
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from http.client import HTTPResponse
-import urllib.error, urllib.request, urllib.response, urllib.parse
-import dateutil.parser
 import unicodedata
 import re
-import ast
 import traceback
-
-from helpers import flatten
+import functools
+import itertools
 
 # optional dependency: pillow
 try:
@@ -37,34 +31,48 @@ class Unicode:
     def _combine(text: str, overlay: str) -> str:
         return Unicode._combine2(text, overlay, [])
     
+    # see https://stackoverflow.com/questions/58132476/why-will-unicode-u0332-not-underline-space-u0020
+    # test https://yaytext.com/underline/
+    __SPACE_REPLACEMENTS = {
+        '\u0332': '\u005f', # underline: \u005f or \uff3f
+        '\u0347': '\u2017', # double underline
+        '\u0305': '\u203e', # overline: \u203e or \u00af
+        '\u033f': '\u203e', # double overline (no independent char for this)
+    }
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def __normalize_char(ch: str) -> str:
+        return unicodedata.normalize('NFKD', ch) # catch accented chars
+
     @staticmethod
-    def _combine2(text: str, overlay: str, blacklist_chars: list[str]) -> str:
+    def _combine2(text: str, overlay: str, blacklist_chars: Collection[str]) -> str:
         text = str(text)
         if not text: return ''
-        normalized = [unicodedata.normalize('NFKD', ch) for ch in text] # catch accented chars
-        # see https://stackoverflow.com/questions/58132476/why-will-unicode-u0332-not-underline-space-u0020
-        # test https://yaytext.com/underline/
-        space_replacement = (
-            ('\u005f',) if overlay == '\u0332' # underline: \u005f or \uff3f
-            else ('\u2017',) if overlay == '\u0347' # double underline
-            else ('\u203e',) if overlay == '\u0305' # overline: \u203e or \u00af
-            else ('\u203e',) if overlay == '\u033f' # double overline (no independent char for this)
-            else (' ',)
-        )
-        if blacklist_chars:
-            arr = flatten(
-                space_replacement if normalized[i] == ' '
-                else (ch, overlay) if normalized[i] not in blacklist_chars
-                else (ch,)
-                for i, ch in enumerate(text)
-            )
+        space_replacement = Unicode.__SPACE_REPLACEMENTS.get(overlay, ' ')
+        if len(text) > 160:
+            # long text (wide table headers) repeats chars a lot, so build the replacement once per unique char.
+            # for shorter text, building the table costs more than it saves
+            table = {}
+            for ch in set(text):
+                n = ch if ch.isascii() else Unicode.__normalize_char(ch)
+                table[ord(ch)] = (
+                    space_replacement if n == ' '
+                    else ch if n in blacklist_chars
+                    else ch + overlay
+                )
+            return text.translate(table)
+        if text.isascii():
+            # NFKD doesn't change ascii
+            normalized = text
         else:
-            arr = flatten(
-                space_replacement if normalized[i] == ' '
-                else (ch, overlay)
-                for i, ch in enumerate(text)
-            )
-        return ''.join(arr)
+            normalized = map(Unicode.__normalize_char, text)
+        return ''.join([
+            space_replacement if n == ' '
+            else ch if n in blacklist_chars
+            else ch + overlay
+            for ch, n in zip(text, normalized)
+        ])
 
     @staticmethod
     def strike(text: str):
@@ -76,7 +84,7 @@ class Unicode:
         # TODO: numbers sometimes look terrible, probably applies to all underscores
         return Unicode._combine(text, '\u0332')
     
-    __UNERLINE_OVERLAP_CHARS = set(('p', 'q', 'j', 'g', 'y', ',', '.', '_'))
+    __UNERLINE_OVERLAP_CHARS = frozenset(('p', 'q', 'j', 'g', 'y', ',', '.', '_'))
 
     @staticmethod
     def underline2(text: str):
@@ -127,6 +135,58 @@ def measure_text(text: str, font: str | dict[str, int]) -> int:
         text = str(text)
     if not text:
         return 0
+    return _measure_str(text, measures)
+
+# single underscore (also _align_text_amounts_from_size): used by TableFormatter, where __names would be mangled
+def _measure_str(text: str, measures: dict[str, int]) -> int:
+    """`measure_text` for a str and already resolved measures"""
+    # only the known font tables are cached: they're constant and registered up front.
+    # a measures dict from the caller may change (or be one of many), so it's measured directly every time
+    measures_id = id(measures)
+    if measures_id in __MEASURES_BY_ID:
+        return __measure_text_cached(measures_id, text)
+    return __measure_chars(text, measures)
+
+# known font tables by id, measures dicts aren't hashable so the cache is keyed on their id (they're kept alive so ids stay unique)
+__MEASURES_BY_ID: dict[int, dict[str, int]] = {}
+__ASCII_WIDTHS: dict[int, tuple[list[int], tuple[bytes, bytes] | None, bytes, int]] = {}
+
+def __register_measures(measures: dict[str, int]):
+    """Register a known font table for the id-keyed caches and build its flat ascii widths table
+    (widths indexed by ascii code, the same widths split into low/high byte translate tables if they fit in 16 bits,
+    ascii codes present in measures, width of every char if monospace else 0)
+    """
+    measures_id = id(measures)
+    __MEASURES_BY_ID[measures_id] = measures
+    widths = [measures.get(chr(i), 0) for i in range(128)]
+    if all(isinstance(w, int) and 0 <= w <= 0xffff for w in widths):
+        padding = bytes(128) # translate tables need all 256 entries
+        width_bytes = (bytes(w & 0xff for w in widths) + padding, bytes(w >> 8 for w in widths) + padding)
+    else:
+        width_bytes = None
+    known = bytes(i for i in range(128) if chr(i) in measures)
+    mono_widths = set(measures.values())
+    mono_width = mono_widths.pop() if len(mono_widths) == 1 else 0
+    __ASCII_WIDTHS[measures_id] = (widths, width_bytes, known, mono_width)
+
+@functools.lru_cache(maxsize=4096)
+def __measure_text_cached(measures_id: int, text: str) -> int:
+    measures = __MEASURES_BY_ID[measures_id]
+    if text.isascii():
+        # fast path: deleting the known chars leaves nothing if they're all known
+        widths, width_bytes, known, mono_width = __ASCII_WIDTHS[measures_id]
+        encoded = text.encode('ascii')
+        if not encoded.translate(None, known):
+            if mono_width:
+                return mono_width * len(encoded)
+            if width_bytes:
+                # bytes.translate does the per-char lookups in C, summing bytes is also much faster than a map over a list
+                low, high = width_bytes
+                return sum(encoded.translate(low)) + (sum(encoded.translate(high)) << 8)
+            return sum(map(widths.__getitem__, encoded))
+    return __measure_chars(text, measures)
+
+def __measure_chars(text: str, measures: dict[str, int]) -> int:
     if all(ch in measures for ch in text):
         return sum(measures[ch] for ch in text)
     
@@ -134,7 +194,8 @@ def measure_text(text: str, font: str | dict[str, int]) -> int:
     ptext = plaintext(text)
     # TODO: correct measurements for special chars like Ⓡ Ⓑ ⃝ ⌽ ⍉ ⛝
     # ascii_text = ptext.encode('ascii', 'ignore').decode('ascii', 'ignore').replace('\0', '')
-    return sum(measures.get(ch, 'avg') for ch in ptext)
+    avg = measures['avg']
+    return sum(measures.get(ch, avg) for ch in ptext)
 
 def align_text_amounts(text: str, width: int, direction='left',
                        font: str | dict[str, int] = OsuFontNames.STABLE
@@ -153,11 +214,15 @@ def align_text_amounts(text: str, width: int, direction='left',
     if not isinstance(text, str):
         text = str(text)
     measures = get_font_measures(font)
-    size = measure_text(text, measures)
-    space_size = measure_text(' ', measures)
-    if size > width:
+    size = _measure_str(text, measures) if text else 0
+    space_size = measures.get(' ') or measures['avg']
+    return _align_text_amounts_from_size(size, width, space_size, direction)
+
+def _align_text_amounts_from_size(size: int, width: int, space_size: int, direction: str) -> tuple[int, int]:
+    """`align_text_amounts` for text that was already measured"""
+    if width <= 0 or size > width:
         return 0, 0
-    n_spaces = int((float(width - size) / space_size) + 0.5)
+    n_spaces = (2 * (width - size) + space_size) // (2 * space_size) # round(float(width - size) / space_size)
     # err = width - (size + space_size*n_spaces)
     if n_spaces == 0:
         return 0, 0
@@ -187,93 +252,104 @@ def align_text(text: str, width: int, direction='left',
     """
     if not isinstance(text, str):
         text = str(text)
-    nl, nr = align_text_amounts(text, width, direction, font)
+    if width <= 0:
+        return text
+    # resolve the font once and skip the checks align_text_amounts would redo
+    measures = get_font_measures(font)
+    space_size = measures.get(' ') or measures['avg']
+    size = _measure_str(text, measures) if text else 0
+    nl, nr = _align_text_amounts_from_size(size, width, space_size, direction)
     if nl == nr == 0:
         return text
     else:
         return (' '*nl) + text + (' '*nr)
 
-__osu_link_regex = re.compile(r"\[http[^\] ]+ ([^\]]+)\]", re.IGNORECASE)
-__markdown_link_regex = re.compile(r"(\[[^\]]+\])\(http[^\(\) ]+\)", re.IGNORECASE)
-# \033 are ANSI escape codes, the other chars are terminal controls
-__terminal_control_regex = re.compile(r"(?:\033\[\d+(?:;\d+)*[a-zA-Z])|[\a\b\v\0\177]")
+__osu_link_regex = re.compile(r"\[http[^\] ]+ ([^\]]+)\]", re.IGNORECASE | re.ASCII)
+__markdown_link_regex = re.compile(r"(\[[^\]]+\])\(http[^\(\) ]+\)", re.IGNORECASE | re.ASCII)
+# ANSI escape codes
+__ansi_escape_regex = re.compile(r"\033\[\d+(?:;\d+)*[a-zA-Z]", re.ASCII)
+# terminal controls
+__terminal_control_table = str.maketrans('', '', '\a\b\v\0\177')
 
 # https://unicode-explorer.com/blocks
+__COMBINING_CHARS = frozenset(chr(i) for i in itertools.chain(
+    range(0x0300, 0x0370), # combining diacritical marks
+    range(0x0483, 0x048a), # combining cyrillic
+    range(0x07eb, 0x07f4), # nko combining tones
+    range(0x1ab0, 0x1b00), # combining diacritical marks extended
+    range(0x1b6b, 0x1b74), # combining balinese musical symbol
+    range(0x1dc0, 0x1e00), # combining diacritical marks supplement
+    range(0x20d0, 0x2100), # combining diacritical marks for symbols
+    range(0x2de0, 0x2e00), # combining cyrillic
+    range(0x3099, 0x309b), # combining katakana-hiragana sound mark
+    range(0xa66f, 0xa67e), # combining cyrillic
+    range(0xa8e0, 0xa8f2), # combining devanagari
+    range(0xfe20, 0xfe30), # combining half marks
+))
+__remove_combining_chars_table = dict.fromkeys(map(ord, __COMBINING_CHARS), None)
+
 def is_unicode_combining_char(ch: str):
-    if ch < '\u0300': return False # beginning of first combining block
-    if ch > '\ufe2f': return False # end of last combining block
-    elif ch < '\u1000':
-        # combining diacritical marks
-        if ch < '\u0300': return False
-        elif ch <= '\u036f': return True
-        # combining cyrillic
-        elif ch < '\u0483': return False
-        elif ch >= '\u0489': return True
-        # nko combining tones
-        elif ch < '\u07eb': return False
-        elif ch >= '\u07f3': return True
-    elif ch < '\u2000':
-        # combining diacritical marks extended
-        if ch < '\u1ab0': return False
-        elif ch <= '\u1aff': return True
-        # combining balinese musical symbol
-        elif ch < '\u1b6b': return False
-        elif ch <= '\u1b73': return True 
-        # combining diacritical marks supplement
-        elif ch < '\u1dc0': return False
-        elif ch <= '\u1dff': return True
-    elif ch < '\ua000':
-        # combining diacritical marks for symbols
-        if ch < '\u20d0': return False
-        elif ch <= '\u20ff': return True
-        # combining cyrillic
-        elif ch < '\u2de0': return False
-        elif ch <= '\u2dff': return True
-        # combining katakana-hiragana sound mark
-        elif ch in ('\u3099', '\u309a'): return True
-    else:
-        # combining cyrillic
-        if ch < '\ua66f': return False
-        elif ch <= '\ua67d': return True
-        # combining devanagari
-        elif ch < '\ua8e0': return False
-        elif ch <= '\ua8f1': return True
-        # combining half marks
-        elif ch < '\ufe20': return False
-        elif ch <= '\ufe2f': return True
-    return False
+    return ch in __COMBINING_CHARS
 
 def remove_unicode_combining_marks(text: str):
     """Remove unicode combining marks (underline, overline, etc.)"""
-    if all(ch < '\u0300' or ch > '\ufe2f' for ch in text):
+    if text.isascii():
         return text
-    ptext = ''.join(ch for ch in text if not is_unicode_combining_char(ch))
-    return ptext
+    return text.translate(__remove_combining_chars_table)
 
 def plaintext(text: str, remove_links=True):
     """Try to get only the meaningful plaintext from some input text. \n
     This tries to removes all escape sequences, control codes, unicode overlays, and
     remove links (`[alias](link)` -> `link`) from markdown/osu links (since only the alias should be shown)
     """
-    ptext = str(text)
+    return __plaintext_cached(str(text), bool(remove_links))
+
+# bounded, the bot can run for a long time with all sorts of chat messages
+@functools.lru_cache(maxsize=2048)
+def __plaintext_cached(ptext: str, remove_links: bool):
     # remove control characters
-    ptext = __terminal_control_regex.sub('', ptext)
+    if '\033' in ptext:
+        ptext = __ansi_escape_regex.sub('', ptext)
+    ptext = ptext.translate(__terminal_control_table)
+
+    # nothing left to normalize or strip in plain ascii without links
+    is_ascii = ptext.isascii()
+    if is_ascii and '[' not in ptext:
+        return ptext
     
     # convert unicode -> ansi equivalents for table lookups (eg: a with accents -> a)
-    ptext = unicodedata.normalize('NFKD', ptext) # or NFC?
+    # (NFKD doesn't change ascii)
+    if not is_ascii:
+        ptext = unicodedata.normalize('NFKD', ptext) # or NFC?
 
     # convert link + alias -> just alias
+    # (osu links first, a markdown link can wrap one: `[[link alias]](link)` -> `[alias](link)` -> `[alias]`)
     if remove_links:
         ptext = __osu_link_regex.sub(r'\g<1>', ptext)
         ptext = __markdown_link_regex.sub(r'\g<1>', ptext)
 
     # remove unicode combining marks (underline, overline, etc.)
-    ptext = remove_unicode_combining_marks(ptext)
+    if not is_ascii:
+        ptext = remove_unicode_combining_marks(ptext)
 
     # ascii_text = ptext.encode('ascii', 'ignore').decode('ascii', 'ignore') # bad for Ⓡ Ⓑ ⃝ ⌽ ⍉ ⛝
     # ascii2_text = ptext.encode('utf-8', 'ignore').decode('ascii', 'replace') # wrong len for Ⓡ Ⓑ ⃝ ⌽ ⍉ ⛝
     return ptext
 
+def test_plaintext():
+    """ Check plaintext against some known inputs """
+    cases = {
+        '\033[31mred\033[0m': 'red',
+        '[https://osu.ppy.sh/b/1 NM1]': 'NM1',
+        '[alias](https://x.y/z)': '[alias]',
+        # nested links
+        '[[http://x y]](http://z)': '[y]',
+        'see [http://a.b [b]](http://c)': 'see [b]',
+    }
+    for text, expected in cases.items():
+        actual = plaintext(text)
+        assert actual == expected, f"plaintext({text!r}) = {actual!r}, expected {expected!r}"
+
 def align_table(headers: list[str] | None,
                 rows: list[list[str]],
                 join_text = ' | ',
@@ -303,76 +379,116 @@ def align_table(headers: list[str] | None,
       it is the same length as the other fields. If `False` and left-justified, last header will not be padded,
       which may look strange if using `underline_header`. If last column is right-justified this will have no effect.
     """
-    measures = get_font_measures(font)
-    join_size = measure_text(join_text, measures)
+    formatter = TableFormatter(headers, join_text, directions, font, accumulate_field_sizes, underline_header, pad_last_field)
+    yield from formatter.format(rows)
 
-    plaintext_headers = [plaintext(h) for h in headers] if headers else []
-    max_column_widths = [measure_text(text, measures) for text in plaintext_headers] if headers else []
-    
-    # plaintext_rows: use regexes to extract labels from formatted links
-    # when using link formatting, the link does not contribute width to how it is displayed
-    plaintext_rows: list[list[str]] = []
-    for r, row in enumerate(rows):
+class TableFormatter:
+    """Formats tables with text approximately aligned, like `align_table` (see it for the params). \n
+    The font, join text and headers are measured once up front, so when rendering the same table
+    repeatedly with new rows, create one of these and call `format(rows)` each time.
+    """
+    def __init__(self,
+                 headers: list[str] | None,
+                 join_text = ' | ',
+                 directions: str | list[str] = 'left',
+                 font: str | dict[str, int] = OsuFontNames.STABLE,
+                 accumulate_field_sizes = True,
+                 underline_header = True,
+                 pad_last_field = False):
+        self.headers = list(headers) if headers else []
+        self.join_text = join_text
+        self.directions = directions
+        self.accumulate_field_sizes = accumulate_field_sizes
+        self.underline_header = underline_header
+        self.pad_last_field = pad_last_field
+
+        self.measures = get_font_measures(font)
+        self.join_size = _measure_str(str(join_text), self.measures)
+        self.space_size = self.measures.get(' ') or self.measures['avg']
+        self.plaintext_headers = [plaintext(h) for h in self.headers]
+        self.header_widths = [_measure_str(text, self.measures) for text in self.plaintext_headers]
+
+    def format(self, rows: list[list[str]]) -> Generator[str]:
+        """Return the header line (if there are headers) and the aligned rows"""
+        measures = self.measures
+        join_text = self.join_text
+        join_size = self.join_size
+        space_size = self.space_size
+        headers = self.headers
+        header_widths = self.header_widths
+        
+        # plaintext_rows: use regexes to extract labels from formatted links
+        # when using link formatting, the link does not contribute width to how it is displayed
+        plaintext_rows: list[list[str]] = []
+        row_widths: list[list[int]] = []
+        for row in rows:
+            plain_cols = [plaintext(col) for col in row]
+            plaintext_rows.append(plain_cols)
+            row_widths.append([_measure_str(col, measures) for col in plain_cols])
+        max_column_widths = [max(widths) for widths in itertools.zip_longest(header_widths, *row_widths, fillvalue=0)]
+
+        # copy so the caller's list isn't extended
+        n_cols = len(max_column_widths)
+        directions = self.directions
         if isinstance(directions, str):
-            directions = [directions] * len(row)
-        plain_cols = [plaintext(col) for col in row]
-        for c, col in enumerate(plain_cols):
-            col_width = measure_text(col, measures)
-            if c > len(max_column_widths):
-                max_column_widths.append(col_width)
-            else:
-                max_column_widths[c] = max(max_column_widths[c], col_width)
-        plaintext_rows.append(plain_cols)
-    if len(max_column_widths) > len(directions):
-        directions += ['left'] * (len(max_column_widths) - len(directions))
-
-    if not pad_last_field or max_column_widths[-1] == 'left':
-        max_column_widths[-1] = 0
-
-    if headers:
-        header_aligns = [align_text_amounts(text, max_column_widths[c], directions[c], measures) for c, text in enumerate(plaintext_headers)]
-        header_text = join_text.join((''.join((nl*' ', text, nr*' ')) for (nl, nr), text in zip(header_aligns, headers)))
-        # header_text = join_text.join((align_text(text, max_column_widths[c], directions[c], measures) for c, text in enumerate(headers)))
-        if underline_header:
-            header_text = Unicode.underline2(header_text)
-        yield header_text
-
-    aligned_fields: list[str] = []
-    for r, row in enumerate(rows):
-        lpad, rpad = '', ''
-        text_acc = ''
-        size_acc = 0
-        aligned_fields.clear()
-        for c, col in enumerate(row):
-            if not accumulate_field_sizes:
-                nl, nr = align_text_amounts(plaintext_rows[r][c], max_column_widths[c], directions[c], measures)
-            else:
-                if c > 0:
-                    text_acc += f'{rpad}{join_text}{lpad}' # estimate...
-                    size_acc += join_size
-                text_acc += plaintext_rows[r][c]
-                size_acc += max_column_widths[c]
-                nl, nr = align_text_amounts(text_acc, size_acc, directions[c], measures)
-            lpad = (' '*nl) #; padding_size = space_size*nr
-            rpad = (' '*nr) #; padding_size = space_size*nr
-            aligned_fields.append(f'{lpad}{col}{rpad}')
-
-        yield join_text.join(aligned_fields)
+            directions = [directions] * n_cols
+        elif len(directions) < n_cols:
+            directions = list(directions) + ['left'] * (n_cols - len(directions))
+
+        if max_column_widths and not self.pad_last_field and directions[-1] == 'left':
+            max_column_widths[-1] = 0
+
+        if headers:
+            header_aligns = [_align_text_amounts_from_size(header_widths[c], max_column_widths[c], space_size, directions[c]) for c in range(len(headers))]
+            header_text = join_text.join((''.join((nl*' ', text, nr*' ')) for (nl, nr), text in zip(header_aligns, headers)))
+            # header_text = join_text.join((align_text(text, max_column_widths[c], directions[c], measures) for c, text in enumerate(headers)))
+            if self.underline_header:
+                header_text = Unicode.underline2(header_text)
+            yield header_text
+
+        accumulate_field_sizes = self.accumulate_field_sizes
+        aligned_fields: list[str] = []
+        for r, row in enumerate(rows):
+            widths = row_widths[r]
+            nl, nr = 0, 0
+            text_size_acc = 0 # measured size of the fields + padding so far
+            size_acc = 0 # target size of the fields so far
+            aligned_fields.clear()
+            for c, col in enumerate(row):
+                if not accumulate_field_sizes:
+                    nl, nr = _align_text_amounts_from_size(widths[c], max_column_widths[c], space_size, directions[c])
+                else:
+                    if c > 0:
+                        text_size_acc += (nr + nl) * space_size + join_size
+                        size_acc += join_size
+                    text_size_acc += widths[c]
+                    size_acc += max_column_widths[c]
+                    nl, nr = _align_text_amounts_from_size(text_size_acc, size_acc, space_size, directions[c])
+                lpad = (' '*nl)
+                rpad = (' '*nr)
+                aligned_fields.append(f'{lpad}{col}{rpad}')
+
+            yield join_text.join(aligned_fields)
+
+# words dropped from font names, and words renamed to the ones used in __KNOWN_FONTS
+__font_name_noise_regex = re.compile(r"\b(?:standard|regular|professional|pro)\b")
+__FONT_NAME_RENAMES = {
+    'narrow': 'thin',
+    'italics': 'italic',
+    'negreta': 'bold', 'cursiva': 'italic', # have seen this in a few fonts
+}
+__font_name_rename_regex = re.compile(r"\b(?:narrow|italics|negreta|cursiva)\b")
+__whitespace_regex = re.compile(r"\s+")
 
 def __standardize_font_name(name: str):
-    return (
-        name.strip().lower()
-        .replace('standard', '', 1)
-        .replace('regular', '', 1)
-        .replace('narrow', 'thin', 1)
-        .replace('italics', 'italic', 1)
-        .replace(' professional', '', 1).replace(' pro', '', 1)
-        .replace('negreta', 'bold', 1).replace('cursiva', 'italic', 1) # have seen this in a few fonts
-    ).replace('  ', ' ').strip()
+    name = __font_name_noise_regex.sub('', name.strip().lower())
+    name = __font_name_rename_regex.sub(lambda m: __FONT_NAME_RENAMES[m.group(0)], name)
+    return __whitespace_regex.sub(' ', name).strip()
 
 def try_get_font_measures(font: str | dict[str, int]):
     """ Try to look up character sizes for common fonts like 'arial' or 'tahoma bold'. \n
     This will be a dict of 'char' -> size (int).
+    For known fonts this is the table itself and measurements using it are cached, so copy it (`dict(measures)`) to change sizes.
 
     Warning: This supports a very limited number of fonts by default and will raise `NotImplemented`
     if unknown, see `__known_fonts`. You can test ahead of time with `is_font_known`.
@@ -384,7 +500,15 @@ def try_get_font_measures(font: str | dict[str, int]):
     """
     if isinstance(font, dict):
         return font
-    font = __standardize_font_name(font).replace(' pro', '', 1).replace('  ', ' ').strip()
+    return __resolve_font(font)
+
+@functools.lru_cache(maxsize=64)
+def __resolve_font(font: str) -> dict[str, int] | None:
+    """Font name -> measures lookup for `try_get_font_measures`, cached since the name
+    standardization and alias lookups are the same every time for a given name.
+    Cleared by `measure_new_font` whenever `__KNOWN_FONTS` changes
+    """
+    font = __standardize_font_name(font)
     measures = __KNOWN_FONTS.get(font, None)
     if measures is not None: return measures
 
@@ -408,6 +532,7 @@ def try_get_font_measures(font: str | dict[str, int]):
 def get_font_measures(font: str | dict[str, int]):
     """ Looks up character sizes for common fonts like 'arial' or 'tahoma bold'. \n
     This will be a dict of 'char' -> size (int).
+    For known fonts this is the table itself and measurements using it are cached, so copy it (`dict(measures)`) to change sizes.
 
     Warning: This supports a very limited number of fonts by default and will raise `NotImplemented`
     if unknown, see `__known_fonts`. You can test ahead of time with `is_font_known`.
@@ -440,6 +565,15 @@ def is_font_known(font: str | dict[str, int]):
 def list_known_fonts():
     return [k for k in __KNOWN_FONTS.keys()]
 
+def __load_font_file(path: str, size: int = 72) -> FreeTypeFont:
+    """Load a font file with pillow, cached by (path, modified time, size) since parsing the font is slow"""
+    return __load_font(path, os.path.getmtime(path), size)
+
+# small: every cached font keeps its FreeType face (and file) open
+@functools.lru_cache(maxsize=8)
+def __load_font(path: str, mtime: float, size: int) -> FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
 def get_font_short_name(font_or_path: FreeTypeFont | str):
     """Get the standardized short name of a font (eg: 'arial', 'arial bold', etc.)
 
@@ -454,17 +588,20 @@ def get_font_short_name(font_or_path: FreeTypeFont | str):
     if isinstance(font_or_path, FreeTypeFont):
         font = font_or_path
     else:
-        font_size = 72
-        font = ImageFont.truetype(font_or_path, font_size)
+        font = __load_font_file(font_or_path)
     name = ' '.join(font.getname())
     name = __standardize_font_name(name)
     return name
 
-def raw_text_width(text: str, font_or_path: FreeTypeFont | str):
+def __new_measuring_canvas():
+    return ImageDraw.Draw(Image.new("RGB", (1, 128), (0,0,0)))
+
+def raw_text_width(text: str, font_or_path: FreeTypeFont | str, draw: ImageDraw.ImageDraw | None = None):
     """Directly measure the text width in a given font
 
     params:
       `font_or_path`: `FreeTypeFont` or path to font file (otf, ttf)
+      `draw`: canvas to measure on, pass one in when measuring many texts to avoid creating a new one each time
     raises:
       `ImportError`: if pillow is not installed
     """
@@ -484,15 +621,15 @@ def raw_text_width(text: str, font_or_path: FreeTypeFont | str):
             font = font_or_path
             font.size = font_size
         else:
-            font = ImageFont.truetype(font_or_path, font_size)
+            font = __load_font_file(font_or_path, font_size)
+        # textlength doesn't depend on the canvas size, so one canvas works for every measurement
+        shared_draw = draw if draw is not None else __new_measuring_canvas()
 
         def raw_text_width_inner(itext: str):
             width = len(itext)*120
 
             # see https://pillow.readthedocs.io/en/stable/reference/ImageDraw.html#PIL.ImageDraw.ImageDraw.textlength
-            im = Image.new("RGB", (width, height), bg_color)
-            draw = ImageDraw.Draw(im)
-            tl0 = draw.textlength(itext, font) # not adjusted for kerning
+            tl0 = shared_draw.textlength(itext, font) # not adjusted for kerning
             return tl0
 
             # using features= requires libraqm (snag dlls from https://www.lfd.uci.edu/~gohlke/pythonlibs/, ctrl+f for libraqm, copy to venv bin directory)
@@ -550,20 +687,33 @@ def measure_new_fonts(dir: str):
     """Runs `measure_new_font` on every font file (otf, ttf) in dir.
     Does nothing if the font is already known.
     """
+    if not __HAS_PILLOW:
+        raise ImportError('Cannot load fonts, missing pillow (pip install pillow)')
     for filename in os.listdir(dir):
         path = os.path.join(dir, filename)
         ext = os.path.splitext(filename)[1].lower()
         if not os.path.isfile(path): continue
         if ext not in ('.otf', '.ttf'): continue
-        name = get_font_short_name(path)
+        # most font files are named after the font, skip loading those that are already known
+        if is_font_known(__standardize_font_name(os.path.splitext(filename)[0])): continue
+        # load directly instead of through the font cache, so scanning a directory doesn't keep every font in it open
+        font = ImageFont.truetype(path, 72)
+        name = get_font_short_name(font)
         if is_font_known(name): continue
         try:
-            measure_new_font(path)
+            measure_new_font(font)
         except Exception as ex:
             print(f"ERROR: Unable to measure font '{path}'")
             traceback.print_exc()
 
 
+# chars measured for every font, in the order they're printed (keyboard rows)
+__MEASURED_CHARS = (
+    '`1234567890-=qwertyuiop[]\\asdfghjkl;\'zxcvbnm,./'
+    '~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?'
+    ' \t'
+)
+
 def measure_new_font(font_or_path: FreeTypeFont | str, should_print=True, should_wrap=True):
     """ Calculate the measurements for a given font or file (a dict of char -> size (int)).
 
@@ -583,17 +733,14 @@ def measure_new_font(font_or_path: FreeTypeFont | str, should_print=True, should
                 raise FileNotFoundError(f"Cannot open font file '{font_or_path}' or find by name '{name}'")
         if not __HAS_PILLOW:
             raise ImportError('Cannot load fonts, missing pillow (pip install pillow)')
-        font = FreeTypeFont(font_or_path, 72)
+        font = __load_font_file(font_or_path)
 
-    chars = (
-        '`1234567890-=qwertyuiop[]\\asdfghjkl;\'zxcvbnm,./'
-        '~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?'
-        ' \t'
-    )
+    chars = __MEASURED_CHARS
     # chars = ' i`'
 
     # 32 is arbitrary to try to keep some precision since we're casting to int
-    measures = { ch: int(32 * raw_text_width(ch, font) + 0.5) for ch in chars }
+    draw = __new_measuring_canvas()
+    measures = { ch: int(32 * raw_text_width(ch, font, draw) + 0.5) for ch in chars }
     if '\t' in measures:
         # don't average the tab char since it isn't a reliable size every time
         avg = int(float(sum((n for (ch, n) in measures.items() if ch != '\t'))) / (len(measures) - 1))
@@ -613,19 +760,28 @@ def measure_new_font(font_or_path: FreeTypeFont | str, should_print=True, should
             j = 0
             for ch in ['q', 'a', 'z', '~', 'Q', 'A', 'Z', ' ']:
                 j = output.find(f"'{ch}'", i)
-            if j == -1:
-                j = i
-                break
-            print('    ' + output[i:j])
-            i = j
+                if j == -1:
+                    j = i
+                    break
+                print('    ' + output[i:j])
+                i = j
         if j < len(output)-1:
             print('    ' + output[j:len(output)-1] + ',')
         print('},')
     # overwrite the dict, mainly for development convenience
     __KNOWN_FONTS[font_name] = measures
+    __register_measures(measures)
+    __resolve_font.cache_clear()
+    __measure_text_cached.cache_clear()
     return measures
 
 
+def __monospace_measures(width: int):
+    """Measures for a monospace font, every char (and 'avg') is `width`"""
+    measures = dict.fromkeys(__MEASURED_CHARS, width)
+    measures['avg'] = width
+    return measures
+
 # these are used for find/replace whenever a font name isn't found in __KNOWN_FONTS
 __KNOWN_FONT_ALIASES: list[tuple[str, str]] = [
     ('noto', 'noto sans'),
@@ -747,72 +903,12 @@ __KNOWN_FONTS = {
         'Z': 1155, 'X': 1260, 'C': 1364, 'V': 1260, 'B': 1260, 'N': 1364, 'M': 1574, '<': 1104, '>': 1104, '?': 1051,
         ' ': 526, '\t': 526, 'avg': 995,
     },
-    'consolas': {
-        '`': 1267, '1': 1267, '2': 1267, '3': 1267, '4': 1267, '5': 1267, '6': 1267, '7': 1267, '8': 1267, '9': 1267, '0': 1267, '-': 1267, '=': 1267,
-        'q': 1267, 'w': 1267, 'e': 1267, 'r': 1267, 't': 1267, 'y': 1267, 'u': 1267, 'i': 1267, 'o': 1267, 'p': 1267, '[': 1267, ']': 1267, '\\': 1267,
-        'a': 1267, 's': 1267, 'd': 1267, 'f': 1267, 'g': 1267, 'h': 1267, 'j': 1267, 'k': 1267, 'l': 1267, ';': 1267, "'": 1267,
-        'z': 1267, 'x': 1267, 'c': 1267, 'v': 1267, 'b': 1267, 'n': 1267, 'm': 1267, ',': 1267, '.': 1267, '/': 1267,
-        '~': 1267, '!': 1267, '@': 1267, '#': 1267, '$': 1267, '%': 1267, '^': 1267, '&': 1267, '*': 1267, '(': 1267, ')': 1267, '_': 1267, '+': 1267,
-        'Q': 1267, 'W': 1267, 'E': 1267, 'R': 1267, 'T': 1267, 'Y': 1267, 'U': 1267, 'I': 1267, 'O': 1267, 'P': 1267, '{': 1267, '}': 1267, '|': 1267,
-        'A': 1267, 'S': 1267, 'D': 1267, 'F': 1267, 'G': 1267, 'H': 1267, 'J': 1267, 'K': 1267, 'L': 1267, ':': 1267, '"': 1267,
-        'Z': 1267, 'X': 1267, 'C': 1267, 'V': 1267, 'B': 1267, 'N': 1267, 'M': 1267, '<': 1267, '>': 1267, '?': 1267,
-        ' ': 1267, '\t': 1267, 'avg': 1267,
-    },
-    'consolas bold': {
-        '`': 1267, '1': 1267, '2': 1267, '3': 1267, '4': 1267, '5': 1267, '6': 1267, '7': 1267, '8': 1267, '9': 1267, '0': 1267, '-': 1267, '=': 1267,
-        'q': 1267, 'w': 1267, 'e': 1267, 'r': 1267, 't': 1267, 'y': 1267, 'u': 1267, 'i': 1267, 'o': 1267, 'p': 1267, '[': 1267, ']': 1267, '\\': 1267,
-        'a': 1267, 's': 1267, 'd': 1267, 'f': 1267, 'g': 1267, 'h': 1267, 'j': 1267, 'k': 1267, 'l': 1267, ';': 1267, "'": 1267,
-        'z': 1267, 'x': 1267, 'c': 1267, 'v': 1267, 'b': 1267, 'n': 1267, 'm': 1267, ',': 1267, '.': 1267, '/': 1267,
-        '~': 1267, '!': 1267, '@': 1267, '#': 1267, '$': 1267, '%': 1267, '^': 1267, '&': 1267, '*': 1267, '(': 1267, ')': 1267, '_': 1267, '+': 1267,
-        'Q': 1267, 'W': 1267, 'E': 1267, 'R': 1267, 'T': 1267, 'Y': 1267, 'U': 1267, 'I': 1267, 'O': 1267, 'P': 1267, '{': 1267, '}': 1267, '|': 1267,
-        'A': 1267, 'S': 1267, 'D': 1267, 'F': 1267, 'G': 1267, 'H': 1267, 'J': 1267, 'K': 1267, 'L': 1267, ':': 1267, '"': 1267,
-        'Z': 1267, 'X': 1267, 'C': 1267, 'V': 1267, 'B': 1267, 'N': 1267, 'M': 1267, '<': 1267, '>': 1267, '?': 1267,
-        ' ': 1267, '\t': 1267, 'avg': 1267,
-    },
-    'consolas italic': {
-        '`': 1267, '1': 1267, '2': 1267, '3': 1267, '4': 1267, '5': 1267, '6': 1267, '7': 1267, '8': 1267, '9': 1267, '0': 1267, '-': 1267, '=': 1267,
-        'q': 1267, 'w': 1267, 'e': 1267, 'r': 1267, 't': 1267, 'y': 1267, 'u': 1267, 'i': 1267, 'o': 1267, 'p': 1267, '[': 1267, ']': 1267, '\\': 1267,
-        'a': 1267, 's': 1267, 'd': 1267, 'f': 1267, 'g': 1267, 'h': 1267, 'j': 1267, 'k': 1267, 'l': 1267, ';': 1267, "'": 1267,
-        'z': 1267, 'x': 1267, 'c': 1267, 'v': 1267, 'b': 1267, 'n': 1267, 'm': 1267, ',': 1267, '.': 1267, '/': 1267,
-        '~': 1267, '!': 1267, '@': 1267, '#': 1267, '$': 1267, '%': 1267, '^': 1267, '&': 1267, '*': 1267, '(': 1267, ')': 1267, '_': 1267, '+': 1267,
-        'Q': 1267, 'W': 1267, 'E': 1267, 'R': 1267, 'T': 1267, 'Y': 1267, 'U': 1267, 'I': 1267, 'O': 1267, 'P': 1267, '{': 1267, '}': 1267, '|': 1267,
-        'A': 1267, 'S': 1267, 'D': 1267, 'F': 1267, 'G': 1267, 'H': 1267, 'J': 1267, 'K': 1267, 'L': 1267, ':': 1267, '"': 1267,
-        'Z': 1267, 'X': 1267, 'C': 1267, 'V': 1267, 'B': 1267, 'N': 1267, 'M': 1267, '<': 1267, '>': 1267, '?': 1267,
-        ' ': 1267, '\t': 1267, 'avg': 1267,
-    },
-    'courier new': {
-        '`': 1383, '1': 1383, '2': 1383, '3': 1383, '4': 1383, '5': 1383, '6': 1383, '7': 1383, '8': 1383, '9': 1383, '0': 1383, '-': 1383, '=': 1383,
-        'q': 1383, 'w': 1383, 'e': 1383, 'r': 1383, 't': 1383, 'y': 1383, 'u': 1383, 'i': 1383, 'o': 1383, 'p': 1383, '[': 1383, ']': 1383, '\\': 1383,
-        'a': 1383, 's': 1383, 'd': 1383, 'f': 1383, 'g': 1383, 'h': 1383, 'j': 1383, 'k': 1383, 'l': 1383, ';': 1383, "'": 1383,
-        'z': 1383, 'x': 1383, 'c': 1383, 'v': 1383, 'b': 1383, 'n': 1383, 'm': 1383, ',': 1383, '.': 1383, '/': 1383,
-        '~': 1383, '!': 1383, '@': 1383, '#': 1383, '$': 1383, '%': 1383, '^': 1383, '&': 1383, '*': 1383, '(': 1383, ')': 1383, '_': 1383, '+': 1383,
-        'Q': 1383, 'W': 1383, 'E': 1383, 'R': 1383, 'T': 1383, 'Y': 1383, 'U': 1383, 'I': 1383, 'O': 1383, 'P': 1383, '{': 1383, '}': 1383, '|': 1383,
-        'A': 1383, 'S': 1383, 'D': 1383, 'F': 1383, 'G': 1383, 'H': 1383, 'J': 1383, 'K': 1383, 'L': 1383, ':': 1383, '"': 1383,
-        'Z': 1383, 'X': 1383, 'C': 1383, 'V': 1383, 'B': 1383, 'N': 1383, 'M': 1383, '<': 1383, '>': 1383, '?': 1383,
-        ' ': 1383, '\t': 1383, 'avg': 1383,
-    },
-    'courier new bold': {
-        '`': 1383, '1': 1383, '2': 1383, '3': 1383, '4': 1383, '5': 1383, '6': 1383, '7': 1383, '8': 1383, '9': 1383, '0': 1383, '-': 1383, '=': 1383,
-        'q': 1383, 'w': 1383, 'e': 1383, 'r': 1383, 't': 1383, 'y': 1383, 'u': 1383, 'i': 1383, 'o': 1383, 'p': 1383, '[': 1383, ']': 1383, '\\': 1383,
-        'a': 1383, 's': 1383, 'd': 1383, 'f': 1383, 'g': 1383, 'h': 1383, 'j': 1383, 'k': 1383, 'l': 1383, ';': 1383, "'": 1383,
-        'z': 1383, 'x': 1383, 'c': 1383, 'v': 1383, 'b': 1383, 'n': 1383, 'm': 1383, ',': 1383, '.': 1383, '/': 1383,
-        '~': 1383, '!': 1383, '@': 1383, '#': 1383, '$': 1383, '%': 1383, '^': 1383, '&': 1383, '*': 1383, '(': 1383, ')': 1383, '_': 1383, '+': 1383,
-        'Q': 1383, 'W': 1383, 'E': 1383, 'R': 1383, 'T': 1383, 'Y': 1383, 'U': 1383, 'I': 1383, 'O': 1383, 'P': 1383, '{': 1383, '}': 1383, '|': 1383,
-        'A': 1383, 'S': 1383, 'D': 1383, 'F': 1383, 'G': 1383, 'H': 1383, 'J': 1383, 'K': 1383, 'L': 1383, ':': 1383, '"': 1383,
-        'Z': 1383, 'X': 1383, 'C': 1383, 'V': 1383, 'B': 1383, 'N': 1383, 'M': 1383, '<': 1383, '>': 1383, '?': 1383,
-        ' ': 1383, '\t': 1383, 'avg': 1383,
-    },
-    'courier new italic': {
-        '`': 1383, '1': 1383, '2': 1383, '3': 1383, '4': 1383, '5': 1383, '6': 1383, '7': 1383, '8': 1383, '9': 1383, '0': 1383, '-': 1383, '=': 1383,
-        'q': 1383, 'w': 1383, 'e': 1383, 'r': 1383, 't': 1383, 'y': 1383, 'u': 1383, 'i': 1383, 'o': 1383, 'p': 1383, '[': 1383, ']': 1383, '\\': 1383,
-        'a': 1383, 's': 1383, 'd': 1383, 'f': 1383, 'g': 1383, 'h': 1383, 'j': 1383, 'k': 1383, 'l': 1383, ';': 1383, "'": 1383,
-        'z': 1383, 'x': 1383, 'c': 1383, 'v': 1383, 'b': 1383, 'n': 1383, 'm': 1383, ',': 1383, '.': 1383, '/': 1383,
-        '~': 1383, '!': 1383, '@': 1383, '#': 1383, '$': 1383, '%': 1383, '^': 1383, '&': 1383, '*': 1383, '(': 1383, ')': 1383, '_': 1383, '+': 1383,
-        'Q': 1383, 'W': 1383, 'E': 1383, 'R': 1383, 'T': 1383, 'Y': 1383, 'U': 1383, 'I': 1383, 'O': 1383, 'P': 1383, '{': 1383, '}': 1383, '|': 1383,
-        'A': 1383, 'S': 1383, 'D': 1383, 'F': 1383, 'G': 1383, 'H': 1383, 'J': 1383, 'K': 1383, 'L': 1383, ':': 1383, '"': 1383,
-        'Z': 1383, 'X': 1383, 'C': 1383, 'V': 1383, 'B': 1383, 'N': 1383, 'M': 1383, '<': 1383, '>': 1383, '?': 1383,
-        ' ': 1383, '\t': 1383, 'avg': 1383,
-    },
+    'consolas': __monospace_measures(1267),
+    'consolas bold': __monospace_measures(1267),
+    'consolas italic': __monospace_measures(1267),
+    'courier new': __monospace_measures(1383),
+    'courier new bold': __monospace_measures(1383),
+    'courier new italic': __monospace_measures(1383),
     'exo 2 bold': {
         '`': 814, '1': 989, '2': 1332, '3': 1304, '4': 1466, '5': 1270, '6': 1355, '7': 1212, '8': 1426, '9': 1355, '0': 1449, '-': 954, '=': 1334,
         'q': 1362, 'w': 1952, 'e': 1290, 'r': 979, 't': 947, 'y': 1295, 'u': 1360, 'i': 636, 'o': 1353, 'p': 1383, '[': 797, ']': 797, '\\': 1270,
@@ -1155,3 +1251,8 @@ __KNOWN_FONTS = {
         ' ': 810, '\t': 2304, 'avg': 1417,
     },
 }
+
+# build the ascii tables for the known fonts up front instead of on first use
+for __measures in __KNOWN_FONTS.values():
+    __register_measures(__measures)
+del __measures